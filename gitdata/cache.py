@@ -0,0 +1,124 @@
+"""
+On-disk cache of GitHub responses used for conditional requests.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Dict, Optional
+
+import requests
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "gitdata")
+
+
+class ResponseCache:
+    """
+    Stores response validators (ETag / Last-Modified) per URL together with the
+    response body so unchanged resources can be revalidated with a 304.
+    
+    Each URL owns a body file and a small JSON validators file next to it, so
+    storing a response never rewrites entries of other URLs and several
+    fetchers (or threads) can share the same cache directory.
+    """
+    
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Initialize the cache.
+        
+        Args:
+            cache_dir: Directory holding the cache (default: ~/.cache/gitdata)
+        """
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.bodies_dir = os.path.join(self.cache_dir, "bodies")
+    
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        Build the conditional request headers for a URL.
+        
+        Args:
+            url: URL about to be requested
+            
+        Returns:
+            Headers dictionary, empty if nothing usable is cached for the URL
+        """
+        entry = self._load_validators(url)
+        if not entry or not os.path.exists(self._body_path(url)):
+            return {}
+        
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    def load_body(self, url: str) -> bytes:
+        """
+        Return the cached body of a URL (used when the server answers 304).
+        
+        Args:
+            url: Cached URL
+            
+        Returns:
+            Raw response body
+        """
+        with open(self._body_path(url), 'rb') as f:
+            return f.read()
+    
+    def store(self, url: str, response: requests.Response) -> None:
+        """
+        Save the validators and body of a successful response.
+        
+        Args:
+            url: Requested URL
+            response: 200 response to cache
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        
+        try:
+            os.makedirs(self.bodies_dir, exist_ok=True)
+            self._atomic_write(self._body_path(url), response.content)
+            validators = {'url': url, 'etag': etag, 'last_modified': last_modified}
+            self._atomic_write(self._validators_path(url), json.dumps(validators).encode('utf-8'))
+        except OSError as e:
+            # Caching is best effort, never fail a download because of it
+            logger.warning("Could not write response cache: %s", e)
+    
+    def _load_validators(self, url: str) -> Optional[Dict[str, Optional[str]]]:
+        """Load the validators of a URL, None if missing, unreadable or for another URL."""
+        try:
+            with open(self._validators_path(url), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get('url') == url else None
+    
+    def _body_path(self, url: str) -> str:
+        """Path of the file holding the cached body of a URL."""
+        return os.path.join(self.bodies_dir, hashlib.sha256(url.encode('utf-8')).hexdigest())
+    
+    def _validators_path(self, url: str) -> str:
+        """Path of the JSON file holding the validators of a URL."""
+        return self._body_path(url) + ".json"
+    
+    def _atomic_write(self, path: str, data: bytes) -> None:
+        """Write data to a temporary file and rename it over the destination."""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -2,18 +2,61 @@
 Command-line interface for gitdata package using Click.
 """
 
+import logging
 import os
 import click
-from typing import Optional
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
 
 from .fetch import GitHubFetcher
 from .process import DataProcessor
 
 
+class _EchoLogHandler(logging.Handler):
+    """
+    Echo package warnings to stderr, holding them back while a progress bar is drawn.
+    """
+    
+    def __init__(self):
+        super().__init__(level=logging.WARNING)
+        self.held: Optional[List[str]] = None
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        message = f"⚠️  {self.format(record)}"
+        if self.held is not None:
+            self.held.append(message)
+        else:
+            click.echo(message, err=True)
+    
+    @contextmanager
+    def hold(self) -> Iterator[None]:
+        """Buffer warnings inside the block and echo them once it exits."""
+        self.held = []
+        try:
+            yield
+        finally:
+            held, self.held = self.held, None
+            for message in held:
+                click.echo(message, err=True)
+
+
+@contextmanager
+def _echo_package_warnings() -> Iterator[_EchoLogHandler]:
+    """Route the package's logged warnings through click for the duration of a run."""
+    handler = _EchoLogHandler()
+    package_logger = logging.getLogger('gitdata')
+    package_logger.addHandler(handler)
+    try:
+        yield handler
+    finally:
+        package_logger.removeHandler(handler)
+
+
 @click.command()
 @click.option('--branch', default='main', help='GitHub branch to fetch from (default: main)')
 @click.option('--save-dir', default='./data', help='Local directory to save processed data (default: ./data)')
-def gitdata_cli(branch: str, save_dir: str):
+@click.option('--no-cache', is_flag=True, help='Do not read or write the GitHub API response cache')
+def gitdata_cli(branch: str, save_dir: str, no_cache: bool):
     """
     Fetch and consolidate CSV data from GitHub repositories by ticker symbols.
     """
@@ -32,72 +75,70 @@ def gitdata_cli(branch: str, save_dir: str):
         return
     
     # Initialize components
-    fetcher = GitHubFetcher()
-    processor = DataProcessor(save_dir)
-    
-    try:
-        # Create save directory if it doesn't exist
-        os.makedirs(save_dir, exist_ok=True)
-        
-        click.echo(f"\n📥 Downloading CSV files from {username}/{repository} (branch: {branch})...")
-        
-        # Fetch CSV files from GitHub
-        csv_files = fetcher.fetch_csv_files(username, repository, branch)
-        
-        if not csv_files:
-            click.echo("❌ No CSV files found in the repository")
-            return
-        
-        click.echo(f"📁 Found {len(csv_files)} CSV files")
-        
-        # Process each CSV file
-        total_processed = 0
-        total_errors = 0
-        ticker_stats = {}
-        
-        for file_info in csv_files:
-            try:
-                click.echo(f"📊 Processing file: {file_info['name']}")
-                
-                # Download and process the file
-                result = processor.process_csv_file(file_info)
-                
-                if result['success']:
-                    total_processed += 1
-                    ticker = result['ticker']
-                    
-                    if ticker not in ticker_stats:
-                        ticker_stats[ticker] = {'files': 0}
-                    
-                    ticker_stats[ticker]['files'] += 1
-                    
-                    # Status message
-                    click.echo(f"✅ Processed {ticker}")
-                else:
-                    total_errors += 1
-                    click.echo(f"⚠️  Skipped: {result['error']}")
-                    
-            except Exception as e:
-                total_errors += 1
-                click.echo(f"❌ Error processing {file_info['name']}: {str(e)}")
-        
-        # Summary
-        click.echo(f"\n📈 Processing Summary:")
-        click.echo(f"   Files processed: {total_processed}")
-        click.echo(f"   Files skipped: {total_errors}")
-        click.echo(f"   Tickers saved: {len(ticker_stats)}")
-        
-        if ticker_stats:
-            click.echo(f"\n💾 Ticker Summary:")
-            for ticker, stats in ticker_stats.items():
-                click.echo(f"   {ticker}.csv ({stats['files']} files)")
-        
-        click.echo(f"\n🎉 All files processed. Raw data saved in {save_dir}")
-        
-    except KeyboardInterrupt:
-        click.echo("\n⏹️  Process interrupted by user")
-    except Exception as e:
-        click.echo(f"\n❌ Unexpected error: {str(e)}")
+    fetcher = GitHubFetcher(use_cache=not no_cache)
+    with DataProcessor(save_dir, fetcher=fetcher) as processor, _echo_package_warnings() as log_handler:
+        try:
+            # Create save directory if it doesn't exist
+            os.makedirs(save_dir, exist_ok=True)
+            
+            click.echo(f"\n📥 Downloading CSV files from {username}/{repository} (branch: {branch})...")
+            
+            # Fetch CSV files from GitHub
+            csv_files = fetcher.fetch_csv_files(username, repository, branch)
+            
+            if not csv_files:
+                click.echo("❌ No CSV files found in the repository")
+                return
+            
+            click.echo(f"📁 Found {len(csv_files)} CSV files")
+            
+            # Process each CSV file
+            total_processed = 0
+            total_errors = 0
+            ticker_stats = {}
+            skipped = []
+            
+            # Files are downloaded concurrently and processed as they arrive; a
+            # single progress bar replaces per-file status lines, and warnings
+            # logged meanwhile are printed after it instead of garbling it
+            with log_handler.hold(), \
+                    click.progressbar(length=len(csv_files), label="📊 Processing files",
+                                      item_show_func=lambda ticker: ticker) as progress:
+                for file_info, result in processor.process_csv_files(csv_files):
+                    if result['success']:
+                        total_processed += 1
+                        ticker = result['ticker']
+                        
+                        if ticker not in ticker_stats:
+                            ticker_stats[ticker] = {'files': 0}
+                        
+                        ticker_stats[ticker]['files'] += 1
+                        progress.update(1, current_item=str(ticker))
+                    else:
+                        total_errors += 1
+                        skipped.append(result['error'])
+                        progress.update(1)
+            
+            for error in skipped:
+                click.echo(f"⚠️  Skipped: {error}")
+            
+            # Summary
+            click.echo(f"\n📈 Processing Summary:")
+            click.echo(f"   Files processed: {total_processed}")
+            click.echo(f"   Files skipped: {total_errors}")
+            click.echo(f"   Tickers saved: {len(ticker_stats)}")
+            
+            if ticker_stats:
+                click.echo(f"\n💾 Ticker Summary:")
+                for ticker, stats in ticker_stats.items():
+                    click.echo(f"   {ticker}.csv ({stats['files']} files)")
+            
+            click.echo(f"\n🎉 All files processed. Raw data saved in {save_dir}")
+            
+        except KeyboardInterrupt:
+            click.echo("\n⏹️  Process interrupted by user")
+        except Exception as e:
+            click.echo(f"\n❌ Unexpected error: {str(e)}")
 
 
 def main():
@@ -2,10 +2,28 @@
 GitHub fetching logic for downloading CSV files from public repositories.
 """
 
+import logging
 import requests
+import requests.adapters
 import base64
-from typing import List, Dict, Optional
+import itertools
+import json
+import os
+from typing import Any, List, Dict, Optional, Tuple
 import time
+from urllib.parse import quote, urlparse
+
+from .cache import ResponseCache
+
+
+logger = logging.getLogger(__name__)
+
+
+RAW_HOST = "raw.githubusercontent.com"
+
+# Every capitalisation of ".csv", so listings can be filtered with endswith()
+# instead of allocating a lowercased copy of each path
+CSV_SUFFIXES = tuple('.' + ''.join(chars) for chars in itertools.product('cC', 'sS', 'vV'))
 
 
 class GitHubFetcher:
@@ -13,18 +31,64 @@ class GitHubFetcher:
     Handles fetching CSV files from GitHub repositories using the GitHub API.
     """
     
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = None, use_cache: bool = True,
+                 tokens: Optional[List[str]] = None):
+        """
+        Initialize the fetcher.
+        
+        Args:
+            cache_dir: Directory of the conditional request cache (default: ~/.cache/gitdata)
+            use_cache: Revalidate cached responses with ETag / Last-Modified instead of
+                downloading them again
+            tokens: GitHub tokens used in rotation for API requests (default: the
+                comma-separated GITHUB_TOKEN or GH_TOKEN environment variable)
+        """
         self.base_url = "https://api.github.com"
-        self.session = requests.Session()
-        # Set a user agent to avoid rate limiting issues
+        self.session = self._create_session()
         self.session.headers.update({
+            'Accept': 'application/vnd.github+json'
+        })
+        # Every other host (raw.githubusercontent.com, caller-supplied download
+        # URLs) gets its own session without the API headers or tokens
+        self.raw_session = self._create_session()
+        self._api_host = urlparse(self.base_url).netloc
+        self.cache = ResponseCache(cache_dir) if use_cache else None
+        
+        # Authenticated requests get 5000 requests/hour per token instead of 60
+        if tokens is None:
+            env_tokens = os.environ.get('GITHUB_TOKEN') or os.environ.get('GH_TOKEN') or ''
+            tokens = env_tokens.split(',')
+        self.tokens = [token.strip() for token in tokens if token.strip()]
+        self._token_cycle = itertools.cycle(self.tokens or [None])
+        # Reset time (epoch seconds) of credentials whose rate limit is exhausted
+        self._exhausted: Dict[Optional[str], float] = {}
+    
+    def _create_session(self) -> requests.Session:
+        """
+        Create an HTTP session with the shared user agent and connection pooling.
+        
+        Returns:
+            Configured session
+        """
+        session = requests.Session()
+        # Set a user agent to avoid rate limiting issues
+        session.headers.update({
             'User-Agent': 'gitdata/1.0.0'
         })
+        # Keep enough pooled keep-alive connections per host for concurrent
+        # downloads so TLS connections are reused instead of set up per file
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=20)
+        session.mount('https://', adapter)
+        return session
     
     def fetch_csv_files(self, username: str, repository: str, branch: str = "main") -> List[Dict]:
         """
         Fetch all CSV files from a GitHub repository.
         
+        Only the listing goes through the rate-limited GitHub API, using a fixed
+        number of requests regardless of repository size; file contents are
+        later downloaded from raw.githubusercontent.com.
+        
         Args:
             username: GitHub username
             repository: Repository name
@@ -39,23 +103,87 @@ class GitHubFetcher:
         csv_files = []
         
         try:
-            # First, verify the repository exists
-            repo_url = f"{self.base_url}/repos/{username}/{repository}"
-            repo_response = self._make_request(repo_url)
+            # Pin the branch head so the listing and every download see one commit
+            commit_sha, tree_sha = self._resolve_branch_sha(username, repository, branch)
             
-            if repo_response.status_code == 404:
-                raise Exception(f"Repository {username}/{repository} not found or is not public")
-            elif repo_response.status_code != 200:
-                raise Exception(f"Failed to access repository: HTTP {repo_response.status_code}")
+            # List every file of the commit with a single Git Trees API call
+            csv_files = self._get_csv_files_from_tree(username, repository, commit_sha, tree_sha)
             
-            # Get repository contents recursively
-            csv_files = self._get_csv_files_recursive(username, repository, branch, "")
+            if csv_files is None:
+                # Tree listing was truncated, walk the contents API instead
+                csv_files = self._get_csv_files_recursive(username, repository, commit_sha, "")
             
             return csv_files
             
         except requests.exceptions.RequestException as e:
             raise Exception(f"Network error while accessing GitHub: {str(e)}")
     
+    def _resolve_branch_sha(self, username: str, repository: str, branch: str) -> Tuple[str, str]:
+        """
+        Resolve the head commit of a branch and its root tree.
+        
+        Args:
+            username: GitHub username
+            repository: Repository name
+            branch: Branch name
+            
+        Returns:
+            Tuple of (head commit SHA, root tree SHA of that commit)
+            
+        Raises:
+            Exception: If the repository or branch cannot be accessed
+        """
+        branch_url = f"{self.base_url}/repos/{username}/{repository}/branches/{quote(branch, safe='/')}"
+        status_code, branch_info = self._get_json(branch_url)
+        
+        # First API request of a listing: a 404 means the repository does not
+        # exist, is private, or has no such branch
+        if status_code == 404:
+            raise Exception(f"Repository {username}/{repository} not found or is not public "
+                            f"(or branch {branch} does not exist)")
+        elif status_code != 200:
+            raise Exception(f"Failed to access repository: HTTP {status_code}")
+        
+        return branch_info['commit']['sha'], branch_info['commit']['commit']['tree']['sha']
+    
+    def _get_csv_files_from_tree(self, username: str, repository: str,
+                                 commit_sha: str, tree_sha: str) -> Optional[List[Dict]]:
+        """
+        List CSV files using the recursive Git Trees API (one request for the whole repository).
+        
+        Args:
+            username: GitHub username
+            repository: Repository name
+            commit_sha: Commit the download URLs point to
+            tree_sha: Root tree SHA of that commit
+            
+        Returns:
+            List of CSV file information dictionaries, or None if the tree
+            listing was truncated by GitHub and is therefore incomplete
+        """
+        tree_url = f"{self.base_url}/repos/{username}/{repository}/git/trees/{tree_sha}?recursive=1"
+        status_code, tree = self._get_json(tree_url)
+        
+        if status_code != 200:
+            raise Exception(f"Failed to list repository tree: HTTP {status_code}")
+        
+        if tree.get('truncated'):
+            return None
+        
+        csv_files = []
+        raw_base = f"https://{RAW_HOST}/{username}/{repository}/{commit_sha}"
+        
+        for item in tree['tree']:
+            if item['type'] == 'blob' and item['path'].endswith(CSV_SUFFIXES):
+                csv_files.append({
+                    'name': item['path'].rsplit('/', 1)[-1],
+                    'path': item['path'],
+                    'download_url': f"{raw_base}/{quote(item['path'])}",
+                    'size': item.get('size', 0)
+                })
+        
+        return csv_files
+    
     def _get_csv_files_recursive(self, username: str, repository: str, branch: str, path: str) -> List[Dict]:
         """
         Recursively search for CSV files in the repository.
@@ -63,7 +191,7 @@ class GitHubFetcher:
         Args:
             username: GitHub username
             repository: Repository name
-            branch: Branch name
+            branch: Branch name or commit SHA to list
             path: Current path in the repository
             
         Returns:
@@ -77,19 +205,17 @@ class GitHubFetcher:
             if branch != "main":
                 contents_url += f"?ref={branch}"
             
-            response = self._make_request(contents_url)
+            status_code, contents = self._get_json(contents_url)
             
-            if response.status_code != 200:
+            if status_code != 200:
                 return csv_files
             
-            contents = response.json()
-            
             # Handle single file response (when path points to a file)
             if isinstance(contents, dict):
                 contents = [contents]
             
             for item in contents:
-                if item['type'] == 'file' and item['name'].lower().endswith('.csv'):
+                if item['type'] == 'file' and item['name'].endswith(CSV_SUFFIXES):
                     # This is a CSV file
                     csv_files.append({
                         'name': item['name'],
@@ -108,7 +234,7 @@ class GitHubFetcher:
             
         except requests.exceptions.RequestException as e:
             # Log the error but continue processing other directories
-            print(f"Warning: Could not access directory {path}: {str(e)}")
+            logger.warning("Could not access directory %s: %s", path, e)
             return csv_files
     
     def download_csv_content(self, download_url: str) -> str:
@@ -116,49 +242,124 @@ class GitHubFetcher:
         Download CSV file content from GitHub.
         
         Args:
-            download_url: Direct download URL for the CSV file
+            download_url: Direct download URL for the CSV file (raw.githubusercontent.com
+                URLs bypass the API session and its rate limit)
             
         Returns:
             CSV content as string
             
+        Raises:
+            Exception: If download fails
+        """
+        # Ensure content is decoded as UTF-8
+        return self.download_csv_bytes(download_url).decode('utf-8', errors='replace')
+    
+    def download_csv_bytes(self, download_url: str) -> bytes:
+        """
+        Download raw CSV file bytes from GitHub without decoding them.
+        
+        Args:
+            download_url: Direct download URL for the CSV file (raw.githubusercontent.com
+                URLs bypass the API session and its rate limit)
+            
+        Returns:
+            CSV content as bytes
+            
         Raises:
             Exception: If download fails
         """
         try:
-            response = self._make_request(download_url)
+            status_code, content = self._get_cached(download_url)
             
-            if response.status_code != 200:
-                raise Exception(f"Failed to download file: HTTP {response.status_code}")
+            if status_code != 200:
+                raise Exception(f"Failed to download file: HTTP {status_code}")
             
-            # Ensure content is decoded as UTF-8
-            response.encoding = 'utf-8'
-            return response.text
+            return content
             
         except requests.exceptions.RequestException as e:
             raise Exception(f"Network error while downloading file: {str(e)}")
     
-    def _make_request(self, url: str, max_retries: int = 3) -> requests.Response:
+    def _get_json(self, url: str) -> Tuple[int, Any]:
+        """
+        Request a GitHub API URL and decode its JSON body.
+        
+        Args:
+            url: API URL to request
+            
+        Returns:
+            Tuple of (HTTP status code, decoded JSON or None if the request failed)
+        """
+        status_code, content = self._get_cached(url)
+        if status_code != 200:
+            return status_code, None
+        return status_code, json.loads(content)
+    
+    def _get_cached(self, url: str) -> Tuple[int, bytes]:
+        """
+        Make a request, revalidating cached GitHub API responses.
+        
+        API responses are requested conditionally and answered from the cache on
+        304, which does not count against the API rate limit. Downloads from other
+        hosts (raw CSV files) are not rate limited and are never cached, so the
+        cache does not keep a second copy of every fetched repository.
+        
+        Args:
+            url: URL to request
+            
+        Returns:
+            Tuple of (HTTP status code, response body); a revalidated cache hit
+            is reported as 200
+        """
+        cache = self.cache if urlparse(url).netloc == self._api_host else None
+        headers = cache.conditional_headers(url) if cache else {}
+        response = self._make_request(url, headers=headers)
+        
+        if response.status_code == 304 and headers:
+            return 200, cache.load_body(url)
+        
+        if response.status_code == 200 and cache:
+            cache.store(url, response)
+        
+        return response.status_code, response.content
+    
+    def _make_request(self, url: str, max_retries: int = 3,
+                      headers: Optional[Dict[str, str]] = None) -> requests.Response:
         """
         Make a request with retry logic for rate limiting.
         
         Args:
             url: URL to request
             max_retries: Maximum number of retries
+            headers: Extra headers for this request only
             
         Returns:
             Response object
         """
+        # Only the GitHub API host receives tokens and rate limit tracking
+        is_api = urlparse(url).netloc == self._api_host
+        session = self.session if is_api else self.raw_session
+        
         for attempt in range(max_retries):
             try:
-                response = self.session.get(url, timeout=30)
+                request_headers = dict(headers or {})
+                token = None
+                if is_api:
+                    token = self._next_token()
+                    if token:
+                        request_headers['Authorization'] = f"Bearer {token}"
+                
+                response = session.get(url, timeout=30, headers=request_headers)
                 
-                # Handle rate limiting
-                if response.status_code == 403 and 'rate limit' in response.text.lower():
+                if is_api:
+                    self._record_rate_limit(token, response)
+                
+                # Handle primary and secondary rate limiting
+                if self._is_rate_limited(response):
                     if attempt < max_retries - 1:
-                        # Wait and retry
-                        wait_time = 60  # Wait 1 minute for rate limit reset
-                        print(f"Rate limited. Waiting {wait_time} seconds before retry...")
-                        time.sleep(wait_time)
+                        wait_time = self._rate_limit_delay(response, token)
+                        if wait_time:
+                            logger.warning("Rate limited. Waiting %d seconds before retry...", wait_time)
+                            time.sleep(wait_time)
                         continue
                     else:
                         raise Exception("GitHub API rate limit exceeded. Please try again later.")
@@ -167,7 +368,7 @@ class GitHubFetcher:
                 
             except requests.exceptions.Timeout:
                 if attempt < max_retries - 1:
-                    print(f"Request timeout. Retrying... (attempt {attempt + 1}/{max_retries})")
+                    logger.warning("Request timeout. Retrying... (attempt %d/%d)", attempt + 1, max_retries)
                     time.sleep(2)
                     continue
                 else:
@@ -175,7 +376,7 @@ class GitHubFetcher:
             
             except requests.exceptions.RequestException as e:
                 if attempt < max_retries - 1:
-                    print(f"Request failed. Retrying... (attempt {attempt + 1}/{max_retries})")
+                    logger.warning("Request failed. Retrying... (attempt %d/%d)", attempt + 1, max_retries)
                     time.sleep(2)
                     continue
                 else:
@@ -183,3 +384,87 @@ class GitHubFetcher:
         
         # This should never be reached, but just in case
         raise Exception("Maximum retries exceeded")
+    
+    def _is_rate_limited(self, response: requests.Response) -> bool:
+        """
+        Check whether a response was rejected by GitHub's rate limiting.
+        
+        Args:
+            response: Response to inspect
+            
+        Returns:
+            True for 429 responses and for 403 responses caused by a rate limit
+        """
+        if response.status_code == 429:
+            return True
+        if response.status_code != 403:
+            return False
+        return (response.headers.get('X-RateLimit-Remaining') == '0'
+                or 'Retry-After' in response.headers
+                or 'rate limit' in response.text.lower())
+    
+    def _rate_limit_delay(self, response: requests.Response, token: Optional[str]) -> int:
+        """
+        Compute how long to wait before retrying a rate limited request.
+        
+        Args:
+            response: Rate limited response
+            token: Token used for the request, or None if unauthenticated
+            
+        Returns:
+            Seconds to sleep; 0 when the exhausted credential was recorded and
+            _next_token() will rotate or wait until its X-RateLimit-Reset
+        """
+        # Secondary rate limits tell how long to back off
+        if 'Retry-After' in response.headers:
+            try:
+                return max(1, int(response.headers['Retry-After']))
+            except ValueError:
+                return 60
+        
+        if token in self._exhausted:
+            return 0
+        
+        return 60
+    
+    def _next_token(self) -> Optional[str]:
+        """
+        Pick the credential for the next API request, rotating through the token pool.
+        
+        Credentials with an exhausted rate limit are skipped; if all of them are
+        exhausted, wait until the first one resets instead of hitting a 403.
+        
+        Returns:
+            Token to authenticate with, or None for unauthenticated requests
+        """
+        candidates = self.tokens or [None]
+        now = time.time()
+        
+        for _ in range(len(candidates)):
+            token = next(self._token_cycle)
+            if self._exhausted.get(token, 0) <= now:
+                self._exhausted.pop(token, None)
+                return token
+        
+        token = min(candidates, key=self._exhausted.__getitem__)
+        wait_time = self._exhausted.pop(token) - now + 1
+        logger.warning("Rate limit reached. Waiting %d seconds for it to reset...", wait_time)
+        time.sleep(wait_time)
+        return token
+    
+    def _record_rate_limit(self, token: Optional[str], response: requests.Response) -> None:
+        """
+        Remember when a credential ran out of API requests.
+        
+        Args:
+            token: Token used for the request, or None if unauthenticated
+            response: API response carrying the X-RateLimit-* headers
+        """
+        if response.headers.get('X-RateLimit-Remaining') != '0':
+            return
+        
+        try:
+            reset = float(response.headers['X-RateLimit-Reset'])
+        except (KeyError, ValueError):
+            reset = time.time() + 60
+        self._exhausted[token] = reset
@@ -2,32 +2,61 @@
 Data processing logic for cleaning and consolidating financial OHLCV data.
 """
 
+import logging
 import pandas as pd
 import os
-from typing import Dict, Optional, List
-from io import StringIO
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+from io import BytesIO
 import warnings
 
 from .fetch import GitHubFetcher
 
 
+logger = logging.getLogger(__name__)
+
+
+class DataValidationError(Exception):
+    """
+    Raised when a CSV file cannot be consolidated by ticker.
+    """
+
+
 class DataProcessor:
     """
     Handles processing and consolidation of CSV data by ticker symbols without modification.
     """
     
-    def __init__(self, save_dir: str = "./data"):
+    def __init__(self, save_dir: str = "./data", fetcher: Optional[GitHubFetcher] = None,
+                 max_open_files: int = 256):
         """
         Initialize the data processor.
         
         Args:
             save_dir: Directory to save processed CSV files
+            fetcher: Fetcher used for downloads, shared with the caller so both use
+                the same session, tokens and response cache (default: a new one)
+            max_open_files: Maximum number of ticker files kept open between writes
         """
         self.save_dir = save_dir
-        self.fetcher = GitHubFetcher()
+        self.fetcher = fetcher or GitHubFetcher()
+        
+        # Ticker files stay open across processed files until close_all(),
+        # called on exit when the processor is used as a context manager
+        self.max_open_files = max_open_files
+        self._writers: "OrderedDict[str, TextIO]" = OrderedDict()
         
         # Possible ticker column names
         self.ticker_columns = ['symbol', 'ticker', 'Symbol', 'Ticker', 'SYMBOL', 'TICKER']
+        # Lookup structures so detection is a set intersection; the list order
+        # decides which column wins when a file has several of them
+        self._ticker_set = frozenset(self.ticker_columns)
+        self._ticker_priority = {name: i for i, name in enumerate(self.ticker_columns)}
+        
+        # Read ticker columns as plain strings: skips type inference on them and
+        # keeps symbols such as "0700" intact (absent columns are ignored)
+        self._read_dtypes = dict.fromkeys(self.ticker_columns, str)
         
         # Suppress pandas warnings for cleaner output
         warnings.filterwarnings('ignore', category=pd.errors.DtypeWarning)
@@ -44,28 +73,93 @@ class DataProcessor:
         """
         try:
             # Download file content
-            csv_content = self.fetcher.download_csv_content(file_info['download_url'])
+            raw = self.fetcher.download_csv_bytes(file_info['download_url'])
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f"Error processing {file_info['name']}: {str(e)}"
+            }
+        
+        return self.process_csv_bytes(file_info, raw)
+    
+    def process_csv_files(self, file_infos: List[Dict], max_workers: int = 8) -> Iterator[Tuple[Dict, Dict]]:
+        """
+        Download files concurrently and process them in listing order.
+        
+        Downloads run on a pool of worker threads so their network round trips
+        overlap, while parsing and saving stay on the calling thread. Files are
+        processed in the order given, so rows appended to each ticker file keep
+        the listing order regardless of which download finishes first. At most
+        twice max_workers downloads are in flight or waiting to be parsed, so
+        memory stays bounded when parsing is slower than downloading.
+        
+        Args:
+            file_infos: List of file information dictionaries from GitHub
+            max_workers: Maximum number of concurrent downloads
+            
+        Yields:
+            Tuples of (file information, processing results) in the order of file_infos
+        """
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        pending_files = iter(file_infos)
+        window = deque()
+        
+        def submit_next() -> None:
+            file_info = next(pending_files, None)
+            if file_info is not None:
+                future = executor.submit(self.fetcher.download_csv_bytes, file_info['download_url'])
+                window.append((file_info, future))
+        
+        try:
+            for _ in range(max_workers * 2):
+                submit_next()
+            
+            while window:
+                # Wait for the oldest download; later ones keep running meanwhile
+                file_info, future = window.popleft()
+                submit_next()
+                
+                try:
+                    raw = future.result()
+                except Exception as e:
+                    yield file_info, {
+                        'success': False,
+                        'error': f"Error processing {file_info['name']}: {str(e)}"
+                    }
+                    continue
+                
+                yield file_info, self.process_csv_bytes(file_info, raw)
+        finally:
+            # Drop queued downloads if the caller stops early (e.g. Ctrl+C)
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def process_csv_bytes(self, file_info: Dict, raw: bytes) -> Dict:
+        """
+        Process downloaded CSV content: clean and save by ticker.
+        
+        Args:
+            file_info: Dictionary containing file information from GitHub
+            raw: Raw CSV bytes, decoded as UTF-8 by the pandas parser
             
+        Returns:
+            Dictionary with processing results
+        """
+        try:
             # Parse CSV content
-            df = pd.read_csv(StringIO(csv_content))
+            df = pd.read_csv(BytesIO(raw), engine='c', low_memory=False, encoding_errors='replace',
+                             dtype=self._read_dtypes)
             
-            if df.empty:
+            if df.shape[0] == 0:
                 return {
                     'success': False,
                     'error': f"File {file_info['name']} is empty"
                 }
             
-            # Validate and clean the data
-            cleaned_df = self._clean_dataframe(df, file_info['name'])
-            
-            if cleaned_df is None or cleaned_df.empty:
-                return {
-                    'success': False,
-                    'error': f"File {file_info['name']} has no valid data after cleaning"
-                }
+            # Validate and split off the ticker column
+            data, tickers = self._clean_dataframe(df, file_info['name'])
             
             # Process each ticker in the file
-            results = self._process_tickers(cleaned_df, file_info['name'])
+            results = self._process_tickers(data, tickers, file_info['name'])
             
             if not results:
                 return {
@@ -82,51 +176,55 @@ class DataProcessor:
                 'rows_processed': first_result['rows_processed']
             }
             
+        except DataValidationError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+            
         except Exception as e:
             return {
                 'success': False,
                 'error': f"Error processing {file_info['name']}: {str(e)}"
             }
     
-    def _clean_dataframe(self, df: pd.DataFrame, filename: str) -> Optional[pd.DataFrame]:
+    def _clean_dataframe(self, df: pd.DataFrame, filename: str) -> Tuple[pd.DataFrame, pd.Series]:
         """
-        Validate a DataFrame and identify ticker column.
+        Validate a DataFrame and split off its ticker column.
+        
+        The ticker column is popped in place rather than renamed and later
+        dropped, so the data columns are never copied before being written.
         
         Args:
-            df: Raw DataFrame from CSV
+            df: Raw DataFrame from CSV (modified in place)
             filename: Name of the source file for error reporting
             
         Returns:
-            DataFrame with ticker column identified or None if validation fails
-        """
-        try:
-            # Check for ticker column
-            ticker_col = None
-            for ticker_name in self.ticker_columns:
-                if ticker_name in df.columns:
-                    ticker_col = ticker_name
-                    break
+            Tuple of (DataFrame without the ticker column, categorical ticker Series)
             
-            if ticker_col is None:
-                print(f"Warning: File {filename} missing ticker/symbol column")
-                return None
-            
-            # Rename ticker column to standard name for consistency
-            if ticker_col != 'ticker':
-                df = df.rename(columns={ticker_col: 'ticker'})
-            
-            return df
-            
-        except Exception as e:
-            print(f"Warning: Error processing {filename}: {str(e)}")
-            return None
+        Raises:
+            DataValidationError: If the file has no ticker/symbol column
+        """
+        # Check for ticker column
+        hits = self._ticker_set.intersection(df.columns)
+        ticker_col = min(hits, key=self._ticker_priority.__getitem__, default=None)
+        
+        if ticker_col is None:
+            raise DataValidationError(f"File {filename} missing ticker/symbol column")
+        
+        # Few distinct tickers repeat over many rows: grouping on category
+        # codes is much cheaper than hashing every string
+        tickers = df.pop(ticker_col).astype('category').rename('ticker')
+        
+        return df, tickers
     
-    def _process_tickers(self, df: pd.DataFrame, filename: str) -> Dict:
+    def _process_tickers(self, df: pd.DataFrame, tickers: pd.Series, filename: str) -> Dict:
         """
         Process data for each ticker and save to separate files without any modifications.
         
         Args:
-            df: DataFrame with ticker data
+            df: DataFrame with ticker data, without the ticker column
+            tickers: Ticker of each row of df
             filename: Source filename for logging
             
         Returns:
@@ -134,23 +232,20 @@ class DataProcessor:
         """
         results = {}
         
-        # Group by ticker
-        ticker_groups = df.groupby('ticker')
+        # The ticker column is redundant in the output, group the data by it
+        ticker_groups = df.groupby(tickers, observed=True)
         
-        for ticker, ticker_df in ticker_groups:
+        written = []
+        
+        for ticker, ticker_data in ticker_groups:
             try:
-                # Remove ticker column from the data (it's redundant now)
-                ticker_data = ticker_df.drop(columns=['ticker'])
-                
                 # Save to file
                 output_file = os.path.join(self.save_dir, f"{ticker}.csv")
+                writer = self._get_writer(output_file)
                 
-                if os.path.exists(output_file):
-                    # Append to existing file without any processing
-                    ticker_data.to_csv(output_file, mode='a', header=False)
-                else:
-                    # Save new file
-                    ticker_data.to_csv(output_file)
+                # Append without any processing, header only for a new file
+                ticker_data.to_csv(writer, header=writer.tell() == 0)
+                written.append(writer)
                 
                 results[ticker] = {
                     'ticker': ticker,
@@ -160,11 +255,57 @@ class DataProcessor:
                 }
                 
             except Exception as e:
-                print(f"Warning: Error processing ticker {ticker} from {filename}: {str(e)}")
+                logger.warning("Error processing ticker %s from %s: %s", ticker, filename, e)
                 continue
         
+        # Handles stay open for the next files, but a processed file's rows
+        # are handed to the OS before its result is reported; handles evicted
+        # meanwhile were already flushed when they were closed
+        for writer in written:
+            if not writer.closed:
+                writer.flush()
+        
         return results
     
+    def _get_writer(self, output_file: str) -> TextIO:
+        """
+        Return the open append handle of an output file, opening it if needed.
+        
+        Args:
+            output_file: Path of the ticker CSV file
+            
+        Returns:
+            Text file handle positioned at the end of the file
+        """
+        writer = self._writers.get(output_file)
+        if writer is not None:
+            # Most recently used handles are evicted last
+            self._writers.move_to_end(output_file)
+            return writer
+        
+        if len(self._writers) >= self.max_open_files:
+            # Close the least recently used file to stay under the limit
+            oldest = next(iter(self._writers))
+            self._writers.pop(oldest).close()
+        
+        writer = open(output_file, 'a', newline='', encoding='utf-8', buffering=1 << 16)
+        self._writers[output_file] = writer
+        return writer
+    
+    def close_all(self) -> None:
+        """
+        Flush and close every ticker file kept open by the processor.
+        """
+        while self._writers:
+            _, writer = self._writers.popitem()
+            writer.close()
+    
+    def __enter__(self) -> "DataProcessor":
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close_all()
+    
     def get_ticker_summary(self) -> Dict:
         """
         Get summary information about all processed ticker files.
@@ -174,19 +315,25 @@ class DataProcessor:
         """
         summary = {}
         
+        # Make pending writes visible before reading the files back
+        for writer in self._writers.values():
+            writer.flush()
+        
         if not os.path.exists(self.save_dir):
             return summary
         
-        for filename in os.listdir(self.save_dir):
-            if filename.endswith('.csv'):
-                ticker = filename[:-4]  # Remove .csv extension
-                filepath = os.path.join(self.save_dir, filename)
+        # scandir entries cache their stat() result, one syscall per file
+        with os.scandir(self.save_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.csv'):
+                    continue
+                
+                ticker = entry.name[:-4]  # Remove .csv extension
                 
                 try:
-                    df = pd.read_csv(filepath)
                     summary[ticker] = {
-                        'rows': len(df),
-                        'file_size': os.path.getsize(filepath)
+                        'rows': self._count_rows(entry.path),
+                        'file_size': entry.stat().st_size
                     }
                 except Exception as e:
                     summary[ticker] = {
@@ -194,3 +341,27 @@ class DataProcessor:
                     }
         
         return summary
+    
+    def _count_rows(self, filepath: str) -> int:
+        """
+        Count the data rows of a CSV file by scanning its newlines, without parsing it.
+        
+        Args:
+            filepath: Path of the CSV file
+            
+        Returns:
+            Number of lines after the header
+        """
+        lines = 0
+        last_chunk = b''
+        
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                lines += chunk.count(b'\n')
+                last_chunk = chunk
+        
+        # Last line may lack a trailing newline
+        if last_chunk and not last_chunk.endswith(b'\n'):
+            lines += 1
+        
+        return max(lines - 1, 0)